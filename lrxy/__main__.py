@@ -1,9 +1,18 @@
 #!/usr/bin/python
 
 import argparse
-from colorama import Fore
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
 from lrxy import mp3, flac, m4a
-from lrxy.modules import get_filetype, fetch_lyric_data, get_lyric
+from lrxy.cache import cache_evict
+from lrxy.colors import CYAN, ERR_PREFIX, GREEN, RED, RESET
+from lrxy.modules import (
+    get_filetype, iter_audio_files, fetch_lyric_data_many, get_lyric
+)
+
+
+_FORMAT_MODULES: dict[str, ModuleType] = {"mp3": mp3, "flac": flac, "m4a": m4a}
 
 
 def read_lrc() -> None:
@@ -21,26 +30,27 @@ def read_lrc() -> None:
     lrc_file: str = args.input
     audio_extension = get_filetype(audio_file)
 
-    if audio_extension["success"]:
-        if audio_extension["format"] == "mp3":
-            audio = mp3.load_audio(audio_file)
-            embed_lyric = mp3.embed_lyric
-        elif audio_extension["format"] == "flac":
-            audio = flac.load_audio((audio_file))
-            embed_lyric = flac.embed_lyric
-        elif audio_extension["format"] == "m4a":
-            audio = m4a.load_audio((audio_file))
-            embed_lyric = m4a.embed_lyric
+    if audio_extension.success:
+        audio_module = _FORMAT_MODULES[audio_extension.format]
+        audio = audio_module.load_audio(audio_file)
 
         with open(lrc_file, "r", encoding="utf-8") as f:
             lyric_text = f.read()
 
-        embed_lyric(audio, lyric_text)
+        audio_module.embed_lyric(audio, lyric_text)
     else:
-        print(audio_extension["message"])
+        print(audio_extension.message)
         exit()
 
 
+def _read_tags(audio_file: tuple[str, ModuleType]) -> dict | Exception:
+    path, audio_module = audio_file
+    try:
+        return audio_module.read_tags_only(path)
+    except Exception as exp:
+        return exp
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         prog="lrxy",
@@ -51,64 +61,80 @@ def main() -> None:
         action="store_true",
         help="write lyric to a lrc file",
     )
-    parser.add_argument("file", nargs="+", help="path of music file")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore and don't update the local lyric cache",
+    )
+    parser.add_argument(
+        "file", nargs="+", help="path of music file or directory of music files")
 
     args = parser.parse_args()
 
-    audio_files = args.file
-
-    for audio_file in audio_files:
-        audio_extension = get_filetype(audio_file)
-
-        if audio_extension["success"]:
-            if audio_extension["format"] == "mp3":
-                audio = mp3.load_audio(audio_file)
-                metadata_loader = mp3.load_metadata
-                embed_lyric = mp3.embed_lyric
-            elif audio_extension["format"] == "flac":
-                audio = flac.load_audio(audio_file)
-                metadata_loader = flac.load_metadata
-                embed_lyric = flac.embed_lyric
-            elif audio_extension["format"] == "m4a":
-                audio = m4a.load_audio(audio_file)
-                metadata_loader = m4a.load_metadata
-                embed_lyric = m4a.embed_lyric
-        else:
-            print(Fore.RED + audio_extension["message"])
-            continue
+    audio_files = []
+    tracks = []
 
-        print(f'Loading music info "{audio_file}"...')
-        try:
-            params: dict = metadata_loader(audio)
-        except Exception as exp:
-            print(
-                f"{Fore.RED}Error: {Fore.RESET}There is something wrong with your music's tags!"
-                f"{Fore.RED}{exp}{Fore.RESET}\n"
-            )
+    for audio_file, audio_extension in iter_audio_files(args.file):
+        if not audio_extension.success:
+            print(audio_extension.message)
             continue
 
-        lyric_data = fetch_lyric_data(params, audio_file)
-        if lyric_data["success"]:
-            lyric_text = get_lyric(lyric_data["data"])
+        audio_files.append((audio_file, _FORMAT_MODULES[audio_extension.format]))
+
+    # Tags are read on a small pool so disk reads overlap; results still
+    # come back in argument order.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        loaded = executor.map(_read_tags, audio_files)
+        for (audio_file, audio_module), params in zip(audio_files, loaded):
+            print(f'Loading music info "{audio_file}"...')
+            if isinstance(params, Exception):
+                print(
+                    f"{ERR_PREFIX}There is something wrong with your music's tags!"
+                    f"{RED}{params}{RESET}\n"
+                )
+                continue
+
+            tracks.append((audio_file, audio_module, params))
+
+    results = fetch_lyric_data_many(
+        [track[2] for track in tracks],
+        [track[0] for track in tracks],
+        use_cache=not args.no_cache,
+    )
+    if not args.no_cache:
+        # Expired rows would otherwise stay in the cache file forever
+        cache_evict()
+
+    for (audio_file, audio_module, _), lyric_data in zip(tracks, results):
+        if lyric_data.success:
+            lyric_text = get_lyric(lyric_data.data)
             if not lyric_text:
                 print(f"This music {audio_file} has no lyrics")
+                continue
         else:
-            print(str(lyric_data["message"]))
+            print(str(lyric_data.message))
             continue
 
         # Uncomment to remove space from beginning of the line
         # lyric_text = "]".join(lyric_text.split("] "))
 
-        if args.separate:
-            lrc_file: str = audio_file.removesuffix(audio_extension["format"]) + "lrc"
-            with open(lrc_file, "w", encoding="utf-8") as f:
-                f.write(lyric_text)
-            print(
-                f"{Fore.GREEN}Done: {Fore.RESET}Saved to: {Fore.CYAN}{lrc_file}{Fore.RESET}")
-        else:
-            embed_lyric(audio, lyric_text)
+        # A file that can't be written is reported and the rest of the
+        # batch is still saved.
+        try:
+            if args.separate:
+                saved_to = os.path.splitext(audio_file)[0] + ".lrc"
+                with open(saved_to, "w", encoding="utf-8") as f:
+                    f.write(lyric_text)
+            else:
+                saved_to = audio_file
+                audio = audio_module.load_audio(audio_file)
+                audio_module.embed_lyric(audio, lyric_text)
+        except Exception as exp:
             print(
-                f"{Fore.GREEN}Done: {Fore.RESET}Saved to: {Fore.CYAN}{audio_file}{Fore.RESET}")
+                f"{ERR_PREFIX}Couldn't save lyric ({exp}): {CYAN}{audio_file}{RESET}")
+            continue
+
+        print(f"{GREEN}Done: {RESET}Saved to: {CYAN}{saved_to}{RESET}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+
+    json_loads = json.loads
+
+    def json_dumps(obj: object) -> bytes:
+        return json.dumps(obj).encode()
+
+
+def _env_int(name: str, default: int) -> int:
+    # A malformed value falls back to the default instead of failing import
+    try:
+        return int(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "lrxy",
+)
+CACHE_FILE = os.path.join(CACHE_DIR, "lyrics.sqlite")
+CACHE_TTL = _env_int("LRXY_CACHE_TTL", 30 * 24 * 60 * 60)
+# Tracks lrclib doesn't know yet are retried sooner than found ones
+NEGATIVE_CACHE_TTL = _env_int("LRXY_NEGATIVE_CACHE_TTL", 24 * 60 * 60)
+
+
+@dataclass(slots=True, frozen=True)
+class CacheEntry:
+    payload: Optional[dict]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expired: bool
+
+
+def cache_key(provider: str, params: dict) -> str:
+    key = (
+        f"{provider}|{params['artist_name']}|{params['track_name']}"
+        f"|{params['album_name']}|{params['duration']}"
+    ).lower()
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+_connection: Optional[sqlite3.Connection] = None
+# Queries are short, so the fetch threads share one connection in turn
+# instead of each opening the database and checking the schema again.
+_connection_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    # Called with _connection_lock held
+    global _connection
+    if _connection is None:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+        except OSError as error:
+            raise sqlite3.OperationalError(str(error)) from error
+        connection = sqlite3.connect(
+            CACHE_FILE, timeout=10.0, check_same_thread=False)
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS lyrics (key TEXT PRIMARY KEY,"
+                " ts INTEGER, payload BLOB, etag TEXT, last_modified TEXT)"
+            )
+        except sqlite3.Error:
+            connection.close()
+            raise
+        _connection = connection
+    return _connection
+
+
+@atexit.register
+def cache_close() -> None:
+    global _connection
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+
+
+def cache_get(key: str) -> Optional[CacheEntry]:
+    try:
+        with _connection_lock:
+            row = _connect().execute(
+                "SELECT ts, payload, etag, last_modified FROM lyrics"
+                " WHERE key = ?",
+                (key,),
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+
+    if row is None:
+        return None
+    # A corrupt row is treated as a miss and overwritten on the next put
+    try:
+        payload = json_loads(row[1])
+    except ValueError:
+        return None
+    if payload is not None and not isinstance(payload, dict):
+        return None
+    ttl = CACHE_TTL if payload is not None else NEGATIVE_CACHE_TTL
+    return CacheEntry(
+        payload=payload,
+        etag=row[2],
+        last_modified=row[3],
+        expired=time.time() - row[0] > ttl,
+    )
+
+
+def cache_put(
+    key: str,
+    payload: Optional[dict],
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None
+) -> None:
+    try:
+        with _connection_lock, _connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO lyrics VALUES (?, ?, ?, ?, ?)",
+                (key, int(time.time()), json_dumps(payload),
+                 etag, last_modified),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def cache_touch(key: str) -> None:
+    try:
+        with _connection_lock, _connect() as connection:
+            connection.execute(
+                "UPDATE lyrics SET ts = ? WHERE key = ?",
+                (int(time.time()), key),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def cache_evict() -> int:
+    now = int(time.time())
+    try:
+        with _connection_lock, _connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM lyrics WHERE ts < ? OR (payload = ? AND ts < ?)",
+                (now - CACHE_TTL, b"null", now - NEGATIVE_CACHE_TTL),
+            )
+    except sqlite3.Error:
+        return 0
+    return cursor.rowcount
+
+
+def conditional_headers(entry: Optional[CacheEntry]) -> dict:
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    return headers
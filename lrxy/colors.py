@@ -0,0 +1,12 @@
+import os
+import sys
+from colorama import Fore
+
+
+# Colour codes are left out when the output is piped or NO_COLOR is set
+USE_COLOR = sys.stdout.isatty() and os.environ.get("NO_COLOR") is None
+RED = Fore.RED if USE_COLOR else ""
+GREEN = Fore.GREEN if USE_COLOR else ""
+CYAN = Fore.CYAN if USE_COLOR else ""
+RESET = Fore.RESET if USE_COLOR else ""
+ERR_PREFIX = f"{RED}Error: {RESET}"
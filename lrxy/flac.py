@@ -1,6 +1,8 @@
 #!/usr/bin/python
 
+import os
 from mutagen.flac import FLAC
+from lrxy.padding import keep_padding
 
 
 def load_audio(filename: str) -> FLAC:
@@ -16,6 +18,69 @@ def load_metadata(audio: FLAC) -> dict:
     }
 
 
+def _parse_vorbis_comment(block: bytes) -> dict:
+    tags = {}
+    offset = 4 + int.from_bytes(block[:4], "little")
+    count = int.from_bytes(block[offset:offset + 4], "little")
+    offset += 4
+    for _ in range(count):
+        length = int.from_bytes(block[offset:offset + 4], "little")
+        offset += 4
+        key, _, value = block[offset:offset + length].decode(
+            "utf-8", "replace").partition("=")
+        offset += length
+        tags.setdefault(key.lower(), value)
+    return tags
+
+
+def read_tags_only(filename: str) -> dict:
+    tags = None
+    duration = None
+    with open(filename, "rb") as f:
+        header = f.read(4)
+        # A leading ID3v2 tag is skipped the same way mutagen does, which
+        # ignores the v2.4 footer flag; such files are rejected by both.
+        if header[:3] == b"ID3":
+            id3_header = header[3:] + f.read(6)
+            size = 0
+            for byte in id3_header[-4:]:
+                size = (size << 7) | (byte & 0x7F)
+            f.seek(size, os.SEEK_CUR)
+            header = f.read(4)
+        if header != b"fLaC":
+            raise ValueError(f"Not a FLAC file: {filename}")
+
+        last_block = False
+        while not last_block and (tags is None or duration is None):
+            block_header = f.read(4)
+            if len(block_header) < 4:
+                break
+            last_block = bool(block_header[0] & 0x80)
+            block_type = block_header[0] & 0x7F
+            length = int.from_bytes(block_header[1:], "big")
+
+            if block_type == 0:  # STREAMINFO
+                streaminfo = f.read(length)
+                sample_rate = int.from_bytes(streaminfo[10:13], "big") >> 4
+                total_samples = int.from_bytes(
+                    streaminfo[13:18], "big") & 0xFFFFFFFFF
+                duration = total_samples / sample_rate if sample_rate else 0
+            elif block_type == 4:  # VORBIS_COMMENT
+                tags = _parse_vorbis_comment(f.read(length))
+            else:
+                f.seek(length, os.SEEK_CUR)
+
+    if tags is None or duration is None:
+        raise ValueError(f"Missing FLAC metadata blocks: {filename}")
+
+    return {
+        "artist_name": tags["artist"],
+        "track_name": tags["title"],
+        "album_name": tags["album"],
+        "duration": int(duration),
+    }
+
+
 def embed_lyric(audio: FLAC, lyric_text: str) -> None:
     audio["LYRICS"] = lyric_text
-    audio.save()
+    audio.save(padding=keep_padding)
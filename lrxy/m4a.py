@@ -1,6 +1,9 @@
 #!/usr/bin/python
 
+import mmap
+from typing import Iterator, Optional
 from mutagen.mp4 import MP4
+from lrxy.padding import keep_padding
 
 
 def load_audio(filename: str) -> MP4:
@@ -16,6 +19,89 @@ def load_metadata(audio: MP4) -> dict:
     }
 
 
+def _iter_atoms(buf: mmap.mmap, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    offset = start
+    while offset + 8 <= end:
+        size = int.from_bytes(buf[offset:offset + 4], "big")
+        kind = buf[offset + 4:offset + 8]
+        header = 8
+        if size == 1:
+            size = int.from_bytes(buf[offset + 8:offset + 16], "big")
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            return
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def _find_atom(buf: mmap.mmap, start: int, end: int, kind: bytes) -> tuple[int, int]:
+    for atom_kind, atom_start, atom_end in _iter_atoms(buf, start, end):
+        if atom_kind == kind:
+            return atom_start, atom_end
+    raise KeyError(kind.decode("latin-1"))
+
+
+def _find_sound_mdhd(buf: mmap.mmap, moov_start: int, moov_end: int) -> Optional[int]:
+    for kind, trak_start, trak_end in _iter_atoms(buf, moov_start, moov_end):
+        if kind != b"trak":
+            continue
+        try:
+            mdia_start, mdia_end = _find_atom(buf, trak_start, trak_end, b"mdia")
+            hdlr_start, _ = _find_atom(buf, mdia_start, mdia_end, b"hdlr")
+            if buf[hdlr_start + 8:hdlr_start + 12] == b"soun":
+                return _find_atom(buf, mdia_start, mdia_end, b"mdhd")[0]
+        except KeyError:
+            continue
+    return None
+
+
+def _read_length(buf: mmap.mmap, start: int) -> tuple[int, int]:
+    # mvhd and mdhd share this layout: version 1 has 64-bit times and length
+    if buf[start] == 1:
+        timescale = int.from_bytes(buf[start + 20:start + 24], "big")
+        length = int.from_bytes(buf[start + 24:start + 32], "big")
+    else:
+        timescale = int.from_bytes(buf[start + 12:start + 16], "big")
+        length = int.from_bytes(buf[start + 16:start + 20], "big")
+    return timescale, length
+
+
+def read_tags_only(filename: str) -> dict:
+    with open(filename, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        moov_start, moov_end = _find_atom(buf, 0, len(buf), b"moov")
+
+        # Like mutagen, prefer the length of the first sound track over the
+        # movie's, which can differ (edit lists, encoder priming).
+        header_start = _find_sound_mdhd(buf, moov_start, moov_end)
+        if header_start is None:
+            header_start, _ = _find_atom(buf, moov_start, moov_end, b"mvhd")
+        timescale, length = _read_length(buf, header_start)
+
+        udta_start, udta_end = _find_atom(buf, moov_start, moov_end, b"udta")
+        meta_start, meta_end = _find_atom(buf, udta_start, udta_end, b"meta")
+        # iTunes writes meta as a full box with 4 bytes of version and flags
+        if buf[meta_start + 4:meta_start + 8] != b"hdlr":
+            meta_start += 4
+        ilst_start, ilst_end = _find_atom(buf, meta_start, meta_end, b"ilst")
+
+        tags = {}
+        for kind, item_start, item_end in _iter_atoms(buf, ilst_start, ilst_end):
+            if kind in (b"\xa9ART", b"\xa9nam", b"\xa9alb"):
+                data_start, data_end = _find_atom(buf, item_start, item_end, b"data")
+                # skip 4 bytes of type indicator and 4 bytes of locale
+                tags[kind] = buf[data_start + 8:data_end].decode("utf-8")
+
+    return {
+        "artist_name": tags[b"\xa9ART"],
+        "track_name": tags[b"\xa9nam"],
+        "album_name": tags[b"\xa9alb"],
+        "duration": int(length / timescale) if timescale else 0,
+    }
+
+
 def embed_lyric(audio: MP4, lyric_text: str) -> None:
     audio["©lyr"] = lyric_text
-    audio.save()
+    audio.save(padding=lambda info: keep_padding(info, 4096))
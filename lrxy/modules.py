@@ -1,65 +1,462 @@
-from typing import Literal, Optional, TypedDict
-from colorama import Fore
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from functools import cache
+from typing import TYPE_CHECKING, Callable, Iterator, Literal, Optional
 import os
-import requests
-import json
+import stat
+import threading
+import time
+from urllib.parse import quote_plus, urlsplit
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+from lrxy.cache import (
+    CacheEntry, cache_get, cache_key, cache_put, cache_touch,
+    conditional_headers
+)
+from lrxy.colors import CYAN, ERR_PREFIX, RESET
 
+if TYPE_CHECKING:
+    import requests
 
-class FetchDataReturnType(TypedDict):
+
+API_URL = "https://lrclib.net/api/get"
+_API_HOST = urlsplit(API_URL).hostname
+_URL_TMPL = API_URL + "?artist_name={}&track_name={}&album_name={}&duration={}"
+
+
+def _env_float(name: str, default: float) -> float:
+    # A malformed value falls back to the default instead of failing import
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = _env_float("LRXY_READ_TIMEOUT", 10.0)
+
+
+@cache
+def _get_session() -> "requests.Session":
+    # requests is imported on first use so that commands which never
+    # touch the network (lrxy-embed) don't pay for importing it.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+        ),
+    ))
+    session.headers.update({
+        "User-Agent": "lrxy (https://github.com/pxeemo/lrxy)",
+    })
+    return session
+
+
+class DomainLimiter:
+    def __init__(self, concurrency: int = 8, min_interval: float = 0.0) -> None:
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.Semaphore] = {}
+        self._next_slot: dict[str, float] = {}
+
+    @contextmanager
+    def acquire(self, host: str) -> Iterator[None]:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.concurrency)
+                self._semaphores[host] = semaphore
+
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+# 429 responses are retried by the session's Retry, which waits for the
+# Retry-After header; the limiter keeps fan-out from causing them.
+_LIMITER = DomainLimiter(concurrency=8, min_interval=0.05)
+
+# Fields of an lrclib record that lrxy uses; the rest isn't kept or cached
+_LYRIC_KEYS = ("id", "instrumental", "plainLyrics", "syncedLyrics")
+
+_FORMAT_MAP = {".mp3": "mp3", ".flac": "flac", ".m4a": "m4a"}
+
+
+@dataclass(slots=True, frozen=True)
+class FetchDataReturnType:
     success: bool
     data: Optional[dict]
     message: Optional[str]
 
 
-class GetFileTypeReturnType(TypedDict):
+@dataclass(slots=True, frozen=True)
+class GetFileTypeReturnType:
     success: bool
     format: Optional[str]
     message: Optional[str]
 
 
+def _unsupported_format(audio_file: str, file_extension: str) -> GetFileTypeReturnType:
+    return GetFileTypeReturnType(
+        success=False,
+        format=file_extension,
+        message=f"{ERR_PREFIX}Unsupported file format '{file_extension}': {CYAN}{audio_file}{RESET}\n       Supported formats: mp3, m4a, flac"
+    )
+
+
+def _file_not_found(audio_file: str, file_extension: str) -> GetFileTypeReturnType:
+    return GetFileTypeReturnType(
+        success=False,
+        format=file_extension,
+        message=f"{ERR_PREFIX}File not found: {CYAN}{audio_file}{RESET}"
+    )
+
+
+def _unreadable_directory(path: str, error: OSError) -> GetFileTypeReturnType:
+    return GetFileTypeReturnType(
+        success=False,
+        format=None,
+        message=f"{ERR_PREFIX}Couldn't read directory ({error.strerror}): {CYAN}{path}{RESET}"
+    )
+
+
+def _get_filetype(
+    audio_file: str,
+    is_file: Callable[[], bool]
+) -> GetFileTypeReturnType:
+    # is_file is only called for supported extensions, so rejected files
+    # never cost a stat call.
+    file_extension = os.path.splitext(audio_file)[1].lower()
+    audio_format = _FORMAT_MAP.get(file_extension)
+    if audio_format is None:
+        return _unsupported_format(audio_file, file_extension)
+    if not is_file():
+        return _file_not_found(audio_file, file_extension)
+    return GetFileTypeReturnType(
+        success=True,
+        format=audio_format,
+        message=None
+    )
+
+
 def get_filetype(audio_file: str) -> GetFileTypeReturnType:
-    _, file_extension = os.path.splitext(audio_file)
-    if os.path.exists(audio_file):
-        if file_extension in ('.mp3', '.flac', '.m4a'):
-            return {
-                "success": True,
-                "format": file_extension[1:],
-                "message": None
-            }
-        else:
-            return {
-                "success": False,
-                "format": file_extension,
-                "message": f"{Fore.RED}Error: {Fore.RESET}Unsupported file format '{file_extension}': {Fore.CYAN}{audio_file}{Fore.RESET}\n       Supported formats: mp3, m4a, flac"
-            }
-    else:
-        return {
-            "success": False,
-            "format": file_extension,
-            "message": f"{Fore.RED}Error: {Fore.RESET}File not found: {Fore.CYAN}{audio_file}{Fore.RESET}"
-        }
+    return _get_filetype(audio_file, lambda: os.path.isfile(audio_file))
+
+
+def get_filetype_from_entry(entry: os.DirEntry) -> GetFileTypeReturnType:
+    # DirEntry caches the file type reported by readdir, so unlike
+    # get_filetype this usually needs no extra stat call.
+    return _get_filetype(entry.path, entry.is_file)
+
+
+def iter_audio_files(paths: list[str]) -> Iterator[tuple[str, GetFileTypeReturnType]]:
+    # Overlapping arguments (a directory twice, or a directory and a file
+    # inside it) are listed and yielded only once.
+    seen_dirs: set[tuple[int, int]] = set()
+    seen_files: set[str] = set()
+
+    for path in paths:
+        # One stat tells directories, files and missing paths apart
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        mode = st.st_mode if st is not None else 0
+
+        if not stat.S_ISDIR(mode):
+            normalized = os.path.abspath(path)
+            if normalized not in seen_files:
+                seen_files.add(normalized)
+                yield path, _get_filetype(path, lambda: stat.S_ISREG(mode))
+            continue
+
+        if (st.st_dev, st.st_ino) in seen_dirs:
+            continue
+        seen_dirs.add((st.st_dev, st.st_ino))
+
+        try:
+            with os.scandir(path) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError as error:
+            yield path, _unreadable_directory(path, error)
+            continue
+
+        for entry in entries:
+            audio_extension = get_filetype_from_entry(entry)
+            # Other files in a music directory (covers, playlists, ...)
+            # are skipped silently.
+            normalized = os.path.abspath(entry.path)
+            if audio_extension.success and normalized not in seen_files:
+                seen_files.add(normalized)
+                yield entry.path, audio_extension
+
+
+def _narrow(data: dict) -> dict:
+    return {key: data[key] for key in _LYRIC_KEYS if key in data}
+
+
+def _music_not_found(audio_file: str) -> FetchDataReturnType:
+    return FetchDataReturnType(
+        success=False,
+        data=None,
+        message=f"{ERR_PREFIX}Couldn't find music: {CYAN}{audio_file}{RESET}\n       Try to change music's tags."
+    )
+
+
+def _unexpected_response(
+    response: "requests.Response",
+    audio_file: str
+) -> FetchDataReturnType:
+    return FetchDataReturnType(
+        success=False,
+        data=None,
+        message=f"{ERR_PREFIX}Unexpected response (HTTP {response.status_code}): {CYAN}{audio_file}{RESET}"
+    )
 
 
-def fetch_lyric_data(params: dict, audio_file: str) -> FetchDataReturnType:
-    URL = "https://lrclib.net/api/get"
+def _lookup_failed(reason: object, audio_file: str) -> FetchDataReturnType:
+    return FetchDataReturnType(
+        success=False,
+        data=None,
+        message=f"{ERR_PREFIX}{reason}: {CYAN}{audio_file}{RESET}"
+    )
+
+
+def _handle_ok(
+    response: "requests.Response",
+    key: Optional[str],
+    audio_file: str
+) -> FetchDataReturnType:
+    try:
+        data = json_loads(response.content)
+    except ValueError:
+        return _unexpected_response(response, audio_file)
+    if not isinstance(data, dict):
+        return _unexpected_response(response, audio_file)
+
+    data = _narrow(data)
+    if key is not None:
+        cache_put(
+            key,
+            data,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+    return FetchDataReturnType(success=True, data=data, message=None)
+
+
+def _handle_not_found(
+    response: "requests.Response",
+    key: Optional[str],
+    audio_file: str
+) -> FetchDataReturnType:
+    if key is not None:
+        cache_put(key, None)
+    return _music_not_found(audio_file)
+
+
+def _handle_other(
+    response: "requests.Response",
+    key: Optional[str],
+    audio_file: str
+) -> FetchDataReturnType:
+    try:
+        message = json_loads(response.content)["message"]
+    except (ValueError, KeyError, TypeError):
+        return _unexpected_response(response, audio_file)
+    return _lookup_failed(message, audio_file)
+
+
+_STATUS_HANDLERS = {200: _handle_ok, 404: _handle_not_found}
+
+
+def _from_cache(cached: CacheEntry, audio_file: str) -> FetchDataReturnType:
+    if cached.payload is None:
+        return _music_not_found(audio_file)
+    return FetchDataReturnType(success=True, data=cached.payload, message=None)
+
+
+class _LookupMemo:
+    # In-process layer in front of the disk cache. Lookups for the same
+    # key wait for the one already in flight instead of repeating it.
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._results: OrderedDict[str, FetchDataReturnType] = OrderedDict()
+        # key -> [lock, number of callers holding or waiting for it]
+        self._key_locks: dict[str, list] = {}
+        self._guard = threading.Lock()
+
+    def get(
+        self,
+        key: str,
+        lookup: Callable[[], FetchDataReturnType]
+    ) -> FetchDataReturnType:
+        with self._guard:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = [threading.Lock(), 0]
+            key_lock[1] += 1
+
+        try:
+            with key_lock[0]:
+                with self._guard:
+                    result = self._results.get(key)
+                    if result is not None:
+                        self._results.move_to_end(key)
+                        # Every caller gets its own copy of the data
+                        return replace(result, data=dict(result.data))
+
+                result = lookup()
+                # Failure messages name the file they were produced for,
+                # so only successful lookups are shared.
+                if result.success:
+                    with self._guard:
+                        self._results[key] = replace(result, data=dict(result.data))
+                        if len(self._results) > self.maxsize:
+                            self._results.popitem(last=False)
+                return result
+        finally:
+            with self._guard:
+                key_lock[1] -= 1
+                if key_lock[1] == 0 and self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+
+    def clear(self) -> None:
+        with self._guard:
+            self._results.clear()
+
+
+_LOOKUPS = _LookupMemo()
+
+
+def fetch_lyric_data(
+    params: dict,
+    audio_file: str,
+    session: Optional["requests.Session"] = None,
+    use_cache: bool = True
+) -> FetchDataReturnType:
+    if not use_cache:
+        return _fetch_lyric_data(params, audio_file, session, None, None)
+
+    key = cache_key("lrclib", params)
+    return _LOOKUPS.get(key, lambda: _fetch_lyric_data(
+        params, audio_file, session, key, cache_get(key)))
+
+
+fetch_lyric_data.cache_clear = _LOOKUPS.clear
+
+
+def _fetch_lyric_data(
+    params: dict,
+    audio_file: str,
+    session: Optional["requests.Session"],
+    key: Optional[str],
+    cached: Optional[CacheEntry]
+) -> FetchDataReturnType:
+    if cached is not None and not cached.expired:
+        return _from_cache(cached, audio_file)
+    if cached is not None and cached.payload is None:
+        cached = None
+
     try:
-        response = requests.get(URL, params=params)
+        with _LIMITER.acquire(_API_HOST):
+            response = (session or _get_session()).get(
+                _URL_TMPL.format(
+                    quote_plus(params["artist_name"]),
+                    quote_plus(params["track_name"]),
+                    quote_plus(params["album_name"]),
+                    int(params["duration"]),
+                ),
+                headers=conditional_headers(cached),
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            )
     except Exception as error:
-        return {"success": False, "data": None, "message": str(error)}
+        return _lookup_failed(error, audio_file)
     else:
-        data = json.loads(response.text)
+        if response.status_code == 304 and cached is not None:
+            cache_touch(key)
+            return FetchDataReturnType(success=True, data=cached.payload, message=None)
 
-        match response.status_code:
-            case 200:
-                return {"success": True, "data": data, "message": None}
-            case 404:
-                return {
-                    "success": False,
-                    "data": None,
-                    "message": f"{Fore.RED}Error: {Fore.RESET}Couldn't find music: {Fore.CYAN}{audio_file}{Fore.RESET}\n       Try to change music's tags."
-                }
-            case _:
-                return {"success": False, "data": None, "message": data.message}
+        handler = _STATUS_HANDLERS.get(response.status_code, _handle_other)
+        return handler(response, key, audio_file)
+
+
+def _fetch_one(
+    params: dict,
+    audio_file: str,
+    session: "requests.Session",
+    key: Optional[str],
+    cached: Optional[CacheEntry]
+) -> FetchDataReturnType:
+    # Like fetch_lyric_data, but with the cache entry fetch_lyric_data_many
+    # has already read. A failing lookup is reported for its own file
+    # instead of aborting the rest of the batch.
+    try:
+        if key is None:
+            return _fetch_lyric_data(params, audio_file, session, None, None)
+        return _LOOKUPS.get(key, lambda: _fetch_lyric_data(
+            params, audio_file, session, key, cached))
+    except Exception as error:
+        return _lookup_failed(error, audio_file)
+
+
+def fetch_lyric_data_many(
+    params_list: list[dict],
+    audio_files: list[str],
+    session: Optional["requests.Session"] = None,
+    use_cache: bool = True
+) -> list[FetchDataReturnType]:
+    if not params_list:
+        return []
+
+    results: list[Optional[FetchDataReturnType]] = [None] * len(params_list)
+    keys: list[Optional[str]] = [None] * len(params_list)
+    entries: list[Optional[CacheEntry]] = [None] * len(params_list)
+    # Create the shared session before fanning out to the worker threads
+    session = session or _get_session()
+
+    # Fresh cache entries are used as they are; stale ones are handed on
+    # so they can be revalidated without reading them again.
+    if use_cache:
+        for index, params in enumerate(params_list):
+            keys[index] = cache_key("lrclib", params)
+            entries[index] = cache_get(keys[index])
+            if entries[index] is not None and not entries[index].expired:
+                results[index] = _from_cache(entries[index], audio_files[index])
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    with ThreadPoolExecutor(max_workers=min(16, len(params_list))) as executor:
+        fetched = executor.map(
+            lambda index: _fetch_one(
+                params_list[index], audio_files[index], session, keys[index],
+                entries[index]),
+            pending,
+        )
+        for index, result in zip(pending, fetched):
+            results[index] = result
+
+    return results
 
 
 def get_lyric(
@@ -67,13 +464,10 @@ def get_lyric(
     default_lyric: Literal["auto", "plain_lyric", "synced_lyric"] = "auto"
 ) -> Optional[str]:
 
-    plain_lyric = data.get("plainLyrics")
-    synced_lyric = data.get("syncedLyrics")
-
-    option_lyric = {
-        "auto": synced_lyric or plain_lyric,
-        "synced_lyric": synced_lyric,
-        "plain_lyric": plain_lyric
-    }
-
-    return option_lyric.get(default_lyric, None)
+    if default_lyric == "synced_lyric":
+        return data.get("syncedLyrics")
+    if default_lyric == "plain_lyric":
+        return data.get("plainLyrics")
+    if default_lyric == "auto":
+        return data.get("syncedLyrics") or data.get("plainLyrics")
+    return None
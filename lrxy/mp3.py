@@ -2,6 +2,7 @@
 
 from mutagen.id3 import USLT
 from mutagen.mp3 import MP3
+from lrxy.padding import keep_padding
 
 
 def load_audio(filename: str) -> MP3:
@@ -17,6 +18,10 @@ def load_metadata(audio: MP3) -> dict:
     }
 
 
+def read_tags_only(filename: str) -> dict:
+    return load_metadata(load_audio(filename))
+
+
 def embed_lyric(audio: MP3, lyric_text: str) -> None:
     lyric = USLT(encoding=3, desc='', text=lyric_text)
 
@@ -25,4 +30,4 @@ def embed_lyric(audio: MP3, lyric_text: str) -> None:
     audio.tags.delall('SYLT')
     audio.tags.add(lyric)
 
-    audio.save()
+    audio.save(padding=keep_padding)
@@ -0,0 +1,11 @@
+from mutagen import PaddingInfo
+
+
+def keep_padding(info: PaddingInfo, minimum: int = 1024) -> int:
+    # mutagen's default would shrink padding above 10 KiB + 1% of the
+    # audio, which rewrites the whole file; keep whatever fits instead.
+    if info.padding >= 0:
+        return info.padding
+    # When the tag outgrows it, add at least mutagen's default
+    # (1 KiB + 0.1% of the audio) so a longer lyric fits next time.
+    return max(minimum, info.get_default_padding())
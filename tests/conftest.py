@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from lrxy import cache, modules
+
+
+def make_params(track: str, album: str = "Pablo Honey", duration: int = 238) -> dict:
+    return {
+        "artist_name": "Radiohead",
+        "track_name": track,
+        "album_name": album,
+        "duration": duration,
+    }
+
+
+def make_record(track: str, synced: bool = True) -> dict:
+    return {
+        "id": 1,
+        "trackName": track,
+        "duration": 238.0,
+        "instrumental": False,
+        "plainLyrics": f"plain {track}",
+        "syncedLyrics": f"[00:01.00] synced {track}" if synced else None,
+    }
+
+
+class FakeSession(requests.Session):
+    # Answers lrclib requests from records (keyed by track name; bytes are
+    # sent as they are) without touching the network, and records every
+    # URL asked for.
+
+    def __init__(self, records=None, delay: float = 0.0) -> None:
+        super().__init__()
+        self.records = {} if records is None else records
+        self.delay = delay
+        self.urls: list[str] = []
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.urls.append(url)
+        if self.delay:
+            time.sleep(self.delay)
+
+        query = {key: values[0] for key, values in parse_qs(urlsplit(url).query).items()}
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        body = self.records.get(query["track_name"])
+        if body is None:
+            response.status_code = 404
+            body = {"message": "Failed to find specified track"}
+        response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        return response
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    cache.cache_close()
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "CACHE_FILE", str(tmp_path / "cache" / "lyrics.sqlite"))
+    modules.fetch_lyric_data.cache_clear()
+    yield
+    cache.cache_close()
+    modules.fetch_lyric_data.cache_clear()
+
+
+@pytest.fixture
+def no_disk_cache(monkeypatch):
+    monkeypatch.setattr(modules, "cache_get", lambda key: None)
+    monkeypatch.setattr(modules, "cache_put", lambda *args, **kwargs: None)
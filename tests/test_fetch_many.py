@@ -0,0 +1,50 @@
+from conftest import FakeSession, make_params, make_record
+from lrxy import cache
+from lrxy.modules import fetch_lyric_data, fetch_lyric_data_many
+
+
+def _fetch(session, tracks, **kwargs):
+    return fetch_lyric_data_many(
+        [make_params(track) for track in tracks],
+        [f"{track}.mp3" for track in tracks],
+        session,
+        **kwargs,
+    )
+
+
+def test_results_follow_argument_order():
+    tracks = ["One", "Two", "Three"]
+    session = FakeSession(records={track: make_record(track) for track in tracks})
+    results = _fetch(session, tracks)
+
+    assert [result.data["syncedLyrics"] for result in results] == [
+        f"[00:01.00] synced {track}" for track in tracks
+    ]
+    assert len(session.urls) == 3
+
+
+def test_fresh_cache_entries_skip_the_network():
+    session = FakeSession(records={"One": make_record("One")})
+    _fetch(session, ["One", "Missing"])
+    results = _fetch(session, ["One", "Missing"])
+
+    assert results[0].success and not results[1].success
+    assert len(session.urls) == 2
+
+
+def test_stale_entries_are_revalidated(monkeypatch):
+    session = FakeSession(records={"One": make_record("One")})
+    _fetch(session, ["One"])
+    # as in a later run: the in-process memo is empty, the disk entry stale
+    fetch_lyric_data.cache_clear()
+    monkeypatch.setattr(cache, "CACHE_TTL", -1)
+    assert _fetch(session, ["One"])[0].success
+    assert len(session.urls) == 2
+
+
+def test_one_failing_track_does_not_stop_the_batch():
+    session = FakeSession(records={"Bad": b"<html>", "Good": make_record("Good")})
+    bad, good = _fetch(session, ["Bad", "Good"], use_cache=False)
+
+    assert not bad.success and "Bad.mp3" in bad.message
+    assert good.success
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import FakeSession, make_params, make_record
+from lrxy import modules
+from lrxy.modules import fetch_lyric_data
+
+
+def test_concurrent_duplicate_lookups_share_one_request():
+    session = FakeSession(records={"Creep": make_record("Creep")}, delay=0.1)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda index: fetch_lyric_data(make_params("Creep"), f"{index}.mp3", session),
+            range(8),
+        ))
+
+    assert len(session.urls) == 1
+    assert all(result.success for result in results)
+
+
+def test_key_locks_are_released_after_lookups():
+    session = FakeSession(records={"Creep": make_record("Creep")}, delay=0.05)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(
+            lambda index: fetch_lyric_data(make_params(f"Track {index % 3}"), "a.mp3", session),
+            range(12),
+        ))
+
+    assert modules._LOOKUPS._key_locks == {}
+
+
+def test_callers_get_their_own_copy_of_the_data(no_disk_cache):
+    session = FakeSession(records={"Creep": make_record("Creep")})
+    first = fetch_lyric_data(make_params("Creep"), "a.mp3", session)
+    first.data["syncedLyrics"] = "changed"
+    second = fetch_lyric_data(make_params("Creep"), "a.mp3", session)
+    second.data["plainLyrics"] = "changed"
+    third = fetch_lyric_data(make_params("Creep"), "a.mp3", session)
+
+    assert len(session.urls) == 1
+    assert third.data == {key: make_record("Creep")[key] for key in modules._LYRIC_KEYS}
+
+
+def test_cache_clear_forgets_results(no_disk_cache):
+    session = FakeSession(records={"Creep": make_record("Creep")})
+    fetch_lyric_data(make_params("Creep"), "a.mp3", session)
+    fetch_lyric_data(make_params("Creep"), "a.mp3", session)
+    assert len(session.urls) == 1
+
+    fetch_lyric_data.cache_clear()
+    fetch_lyric_data(make_params("Creep"), "a.mp3", session)
+    assert len(session.urls) == 2
+
+
+def test_failures_are_not_shared(no_disk_cache):
+    session = FakeSession()
+    first = fetch_lyric_data(make_params("Missing"), "a.mp3", session)
+    second = fetch_lyric_data(make_params("Missing"), "b.mp3", session)
+
+    assert not first.success and "a.mp3" in first.message
+    assert not second.success and "b.mp3" in second.message
+    assert len(session.urls) == 2
+
+
+def test_use_cache_can_be_passed_positionally():
+    session = FakeSession(records={"Creep": make_record("Creep")})
+    for _ in range(2):
+        assert fetch_lyric_data(make_params("Creep"), "a.mp3", session, False).success
+
+    assert len(session.urls) == 2
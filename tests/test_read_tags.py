@@ -0,0 +1,141 @@
+import struct
+from typing import Optional
+
+import pytest
+from mutagen.flac import FLAC
+from mutagen.mp4 import MP4
+
+from lrxy import flac, m4a
+
+ARTIST, TRACK, ALBUM, DURATION = "Radiohead", "Creep", "Pablo Honey", 238
+MOVIE_DURATION = DURATION + 3
+EXPECTED = {
+    "artist_name": ARTIST,
+    "track_name": TRACK,
+    "album_name": ALBUM,
+    "duration": DURATION,
+}
+
+
+def _streaminfo(sample_rate: int = 44100) -> bytes:
+    # 20 bits sample rate, 3 bits channels - 1, 5 bits bps - 1, 36 bits samples
+    bits = (sample_rate << 44) | (1 << 41) | (15 << 36) | (sample_rate * DURATION)
+    return struct.pack(">HH", 4096, 4096) + bytes(6) + bits.to_bytes(8, "big") + bytes(16)
+
+
+def _make_flac(path) -> None:
+    streaminfo = _streaminfo()
+    path.write_bytes(b"fLaC\x80" + len(streaminfo).to_bytes(3, "big") + streaminfo)
+    audio = FLAC(path)
+    audio["artist"], audio["title"], audio["album"] = ARTIST, TRACK, ALBUM
+    audio.save()
+
+
+def _id3v2(flags: int = 0) -> bytes:
+    frames = b"TIT2\x00\x00\x00\x02\x00\x00\x03x"
+    header = b"ID3\x04\x00" + bytes([flags]) + len(frames).to_bytes(4, "big")
+    footer = b"3DI" + header[3:] if flags & 0x10 else b""
+    return header + frames + footer
+
+
+def _atom(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def _length_header(version: int, timescale: int, seconds: int) -> bytes:
+    # version and flags, then creation/modification times, timescale, length
+    if version == 1:
+        return b"\x01\x00\x00\x00" + struct.pack(">QQIQ", 0, 0, timescale, seconds * timescale)
+    return bytes(4) + struct.pack(">IIII", 0, 0, timescale, seconds * timescale)
+
+
+def _make_m4a(
+    path,
+    mvhd_version: int = 0,
+    mdhd_version: int = 0,
+    handler: bytes = b"soun",
+    udta: Optional[bytes] = None
+) -> None:
+    # The movie header is a few seconds longer than the sound track, as
+    # with edit lists or encoder priming; the track length is the one used.
+    mvhd = _length_header(mvhd_version, 1000, MOVIE_DURATION) + bytes(80)
+    mdhd = _atom(b"mdhd", _length_header(mdhd_version, 44100, DURATION) + bytes(4))
+    hdlr = _atom(b"hdlr", bytes(8) + handler + bytes(13))
+    stbl = _atom(b"stbl", _atom(b"stsd", bytes(8)))
+    mdia = _atom(b"mdia", mdhd + hdlr + _atom(b"minf", stbl))
+    trak = _atom(b"trak", _atom(b"tkhd", bytes(84)) + mdia)
+    moov = _atom(b"mvhd", mvhd) + trak + (udta or b"")
+    path.write_bytes(
+        _atom(b"ftyp", b"M4A \x00\x00\x00\x00M4A mp42isom")
+        + _atom(b"moov", moov)
+        + _atom(b"mdat", bytes(100))
+    )
+    if udta is None:
+        audio = MP4(path)
+        audio["\xa9ART"], audio["\xa9nam"], audio["\xa9alb"] = ARTIST, TRACK, ALBUM
+        audio.save()
+
+
+def _mutagen_error(module, path):
+    try:
+        module.load_metadata(module.load_audio(str(path)))
+    except Exception as error:
+        return error
+    return None
+
+
+def test_flac_matches_mutagen(tmp_path):
+    path = tmp_path / "a.flac"
+    _make_flac(path)
+    assert flac.read_tags_only(str(path)) == flac.load_metadata(FLAC(path)) == EXPECTED
+
+
+def test_flac_after_id3_matches_mutagen(tmp_path):
+    path = tmp_path / "a.flac"
+    _make_flac(path)
+    path.write_bytes(_id3v2() + path.read_bytes())
+    assert flac.read_tags_only(str(path)) == flac.load_metadata(FLAC(path)) == EXPECTED
+
+
+def test_flac_after_id3_with_footer_is_rejected_like_mutagen(tmp_path):
+    # mutagen doesn't skip an ID3v2.4 footer either, and lrxy can only
+    # embed lyrics into files mutagen opens.
+    path = tmp_path / "a.flac"
+    _make_flac(path)
+    path.write_bytes(_id3v2(flags=0x10) + path.read_bytes())
+    assert _mutagen_error(flac, path) is not None
+    with pytest.raises(ValueError):
+        flac.read_tags_only(str(path))
+
+
+def test_m4a_matches_mutagen(tmp_path):
+    path = tmp_path / "a.m4a"
+    _make_m4a(path)
+    assert m4a.read_tags_only(str(path)) == m4a.load_metadata(MP4(path)) == EXPECTED
+
+
+@pytest.mark.parametrize("mvhd_version, mdhd_version", [(1, 0), (0, 1), (1, 1)])
+def test_m4a_version_1_headers_match_mutagen(tmp_path, mvhd_version, mdhd_version):
+    path = tmp_path / "a.m4a"
+    _make_m4a(path, mvhd_version=mvhd_version, mdhd_version=mdhd_version)
+    assert m4a.read_tags_only(str(path)) == m4a.load_metadata(MP4(path)) == EXPECTED
+
+
+def test_m4a_without_sound_track_uses_movie_length_like_mutagen(tmp_path):
+    path = tmp_path / "a.m4a"
+    _make_m4a(path, handler=b"vide")
+    expected = {**EXPECTED, "duration": MOVIE_DURATION}
+    assert m4a.read_tags_only(str(path)) == m4a.load_metadata(MP4(path)) == expected
+
+
+@pytest.mark.parametrize("udta", [
+    b"",
+    _atom(b"udta"),
+    _atom(b"udta", _atom(b"meta", bytes(4) + _atom(b"hdlr", bytes(8) + b"mdirappl" + bytes(10)))),
+], ids=["no-udta", "empty-udta", "no-ilst"])
+def test_m4a_without_tags_fails_like_mutagen(tmp_path, udta):
+    path = tmp_path / "a.m4a"
+    _make_m4a(path, udta=udta)
+    assert isinstance(_mutagen_error(m4a, path), KeyError)
+    with pytest.raises(KeyError):
+        m4a.read_tags_only(str(path))